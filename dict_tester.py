@@ -1,14 +1,13 @@
-import json
+from simple_alto_parser.utils import read_json
 
 # open json file and load it
 json_file = 'assets/dicts/locations.json'
-with open(json_file) as f:
-    data = json.load(f)
+data = read_json(json_file)
 
-ids = []
+ids = set()
 for loc in data:
     if loc["geonames_id"] not in ids:
-        ids.append(loc["geonames_id"])
+        ids.add(loc["geonames_id"])
     else:
         print("Already in list:", loc["geonames_id"], loc["entry"])
 
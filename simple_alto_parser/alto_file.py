@@ -1,6 +1,7 @@
 """This module contains the AltoFile class. It is used to parse an alto file and to store the data in a structured
 way. The class is used by the AltoTextParser class."""
 import os.path
+import sys
 
 
 class AltoFile:
@@ -11,17 +12,19 @@ class AltoFile:
     file_path = None
     """The path to the file."""
 
-    file_elements = []
+    file_elements = None
     """A list of the text elements in the alto file. These can be TextBlocks or TextLines, depending on the
     configuration of the parser."""
 
     parser = None
     """The parser that is used to parse the file."""
 
-    def __init__(self, file_path, parser):
-        """The constructor of the class. It takes the path to the file as a parameter."""
+    def __init__(self, file_path, parser, validate=True):
+        """The constructor of the class. It takes the path to the file as a parameter. If validate is False, the
+        caller guarantees that the path is a file (e.g. because it comes from a directory scan) and it is not
+        checked again."""
 
-        if not os.path.isfile(file_path):
+        if validate and not os.path.isfile(file_path):
             raise ValueError("The given path is not a file.")
 
         self.file_path = file_path
@@ -39,16 +42,17 @@ class AltoFile:
 
     def add_file_meta_data(self, parameter_name, parameter_value):
         """This function adds metadata to the file. It takes the parameter name and the parameter value as parameters.
-        The parameter name should be a string and the parameter value can be any type."""
-        self.file_meta_data[parameter_name] = parameter_value
+        The parameter name should be a string and the parameter value can be any type. String names and values are
+        interned, as the same values are usually repeated across many files."""
+        self.file_meta_data[intern_string(parameter_name)] = intern_string(parameter_value)
 
     def get_parser_result_keys(self):
-        parser_keys = []
+        """This function returns the keys of the parser data of all elements, in the order in which they first
+        appear."""
+        parser_keys = {}
         for file_element in self.file_elements:
-            for key, value in file_element.parser_data.items():
-                parser_keys.append(key)
-        parser_keys = list(set(parser_keys))
-        return parser_keys
+            parser_keys.update(dict.fromkeys(file_element.parser_data))
+        return list(parser_keys)
 
     def get_csv_header(self):
         if self.has_lines():
@@ -66,21 +70,21 @@ class AltoFile:
             if print_filename:
                 csv_title_line.append('file')
             if print_attributes:
-                for key, value in self.file_elements[0].element_data.items():
-                    csv_title_line.append(key)
+                csv_title_line.extend(self.file_elements[0].element_data.keys())
             if print_parser_results:
                 # Create a list of all parser keys
                 csv_title_line += self.get_parser_result_keys()
 
             if print_file_meta_data:
-                for key, value in self.file_meta_data.items():
-                    csv_title_line.append(key)
+                csv_title_line.extend(self.file_meta_data.keys())
 
             return csv_title_line
         else:
             return []
 
     def get_csv_lines(self, add_header=True, static_header=None):
+        """This function yields the csv lines of the file, starting with the header if add_header is set. The lines are
+        generated one by one, so they can be written without holding all of them in memory."""
         if self.has_lines():
             if static_header:
                 header = static_header
@@ -88,9 +92,7 @@ class AltoFile:
                 header = self.get_csv_header()
 
             if add_header:
-                csv_lines = [header, ]
-            else:
-                csv_lines = []
+                yield header
 
             lines = self.get_text_lines()
 
@@ -103,41 +105,52 @@ class AltoFile:
             print_filename = self.parser.get_config_value('export', 'csv', 'print_filename', default=False)
             print_file_meta_data = self.parser.get_config_value('export', 'csv', 'print_file_meta_data', default=False)
 
+            # Look up the column of every key once instead of searching the header for each value.
+            column_index = {}
+            for idx, key in enumerate(header):
+                column_index.setdefault(key, idx)
+
+            original_text_idx = header.index("original_text")
+            if print_manipulated:
+                manipulated_text_idx = header.index("manipulated_text")
+            if print_filename:
+                file_idx = header.index("file")
+            if print_parser_results:
+                parser_columns = [(header.index(key), key) for key in self.get_parser_result_keys()]
+            if print_file_meta_data:
+                # The file metadata is the same for every line.
+                meta_data_columns = [(column_index[key], value) for key, value in self.file_meta_data.items()
+                                     if key in column_index]
+
+            file_path = self.file_path
+            header_length = len(header)
+            get_column_index = column_index.get
+
             for line in lines:
-                csv_line = []
-                for item in header:
-                    csv_line.append("")
+                csv_line = [""] * header_length
 
-                csv_line[header.index("original_text")] = line.get_original_text()
+                csv_line[original_text_idx] = line.get_original_text()
                 if print_manipulated:
-                    csv_line[header.index("manipulated_text")] = line.get_text()
+                    csv_line[manipulated_text_idx] = line.get_text()
 
                 if print_filename:
-                    csv_line[header.index("file")] = self.file_path
+                    csv_line[file_idx] = file_path
 
                 if print_attributes:
                     for key, value in line.element_data.items():
-                        try:
-                            csv_line[header.index(key)] = value
-                        except ValueError:
-                            pass
+                        idx = get_column_index(key)
+                        if idx is not None:
+                            csv_line[idx] = value
 
                 if print_parser_results:
-                    for parser_val in self.get_parser_result_keys():
-                        csv_line[header.index(parser_val)] = line.parser_data.get(parser_val, '')
+                    for idx, key in parser_columns:
+                        csv_line[idx] = line.parser_data.get(key, '')
 
                 if print_file_meta_data:
-                    for key, value in self.file_meta_data.items():
-                        try:
-                            csv_line[header.index(key)] = value
-                        except ValueError:
-                            pass
+                    for idx, value in meta_data_columns:
+                        csv_line[idx] = value
 
-                csv_lines.append(csv_line)
-
-            return csv_lines
-        else:
-            return []
+                yield csv_line
 
     def get_standalone_json_object(self):
         json_object = {
@@ -148,29 +161,35 @@ class AltoFile:
         return json_object
 
     def get_json_objects(self):
+        """This function returns a list of the json objects of all elements of the file."""
+        return list(self.iter_json_objects())
+
+    def iter_json_objects(self):
+        """This function yields the json object of each element of the file, one at a time."""
         lines = self.get_text_lines()
 
-        json_objects = []
+        print_file_meta_data = self.parser.get_config_value('export', 'json', 'print_file_meta_data', default=False)
+        print_filename = self.parser.get_config_value('export', 'json', 'print_filename', default=False)
+        file_meta_data = self.file_meta_data
+        file_path = self.file_path
+
         for line in lines:
             d_line = line.to_dict()
-            if self.parser.get_config_value('export', 'json', 'print_file_meta_data', default=False):
-                d_line['file_meta_data'] = self.file_meta_data
-                if self.parser.get_config_value('export', 'json', 'print_filename', default=False):
-                    d_line['file_meta_data']['file'] = self.file_path
-            json_objects.append(d_line)
-
-        return json_objects
+            if print_file_meta_data:
+                d_line['file_meta_data'] = file_meta_data
+                if print_filename:
+                    file_meta_data['file'] = file_path
+            yield d_line
 
     def get_file_name(self, ftype='plain'):
         if ftype not in ['plain', 'csv', 'json']:
             raise ValueError("The given type is not valid.")
 
-        print(os.path.split(self.file_path)[-1])
-
+        file_name = os.path.split(self.file_path)[-1]
         if ftype == 'plain':
-            return os.path.split(self.file_path)[-1]
+            return file_name
         else:
-            return os.path.split(self.file_path)[-1].split('.')[0] + '.' + ftype
+            return file_name.split('.')[0] + '.' + ftype
 
     def __str__(self):
         """This function returns a string representation of the class."""
@@ -180,16 +199,13 @@ class AltoFile:
 class AltoFileElement:
     """This class represents a text element in an alto file. It is used to store the data of a text element."""
 
-    text = ""
-    original_text = ""
-    element_data = {}
-    meta_data = {}
-    parser_data = {}
+    __slots__ = ('text', 'original_text', 'element_data', 'meta_data', 'parser_data')
 
     def __init__(self, text):
         self.text = text
         self.original_text = text
         self.element_data = {}
+        self.meta_data = {}
         self.parser_data = {}
 
     def get_original_text(self, clean=True):
@@ -213,20 +229,20 @@ class AltoFileElement:
             d['original_text'] = self.original_text
 
         d['element_data'] = self.element_data
-        if self.meta_data != {}:
+        if self.meta_data:
             d['meta_data'] = self.meta_data
-        if self.parser_data != {}:
+        if self.parser_data:
             d['parser_data'] = self.parser_data
 
         return d
 
     def add_meta_data(self, key, value):
         """This function adds a key-value pair to the element_data dictionary."""
-        self.meta_data[key] = value
+        self.meta_data[intern_string(key)] = value
 
     def set_attribute(self, key, value):
         """This function adds a key-value pair to the element_data dictionary."""
-        self.element_data[key] = value
+        self.element_data[intern_string(key)] = value
 
     def get_attribute(self, key):
         """This function adds a key-value pair to the element_data dictionary."""
@@ -238,6 +254,7 @@ class AltoFileElement:
 
     def add_parser_data(self, key, value):
         """This function adds a key-value pair to the element_data dictionary."""
+        key = intern_string(key)
         if key in self.parser_data.keys():
             if type(self.parser_data[key]) == list:
                 self.parser_data[key].append(value)
@@ -245,3 +262,11 @@ class AltoFileElement:
                 self.parser_data[key] = [self.parser_data[key], value]
         else:
             self.parser_data[key] = [value]
+
+
+def intern_string(value):
+    """This function interns the given value if it is a string and returns it. Other values, such as the None key of
+    a PAGE property without a key or integer parser data names, are returned unchanged."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
@@ -1,12 +1,17 @@
 import csv
-import json
+import itertools
 import os
 
+from simple_alto_parser.utils import write_json, write_json_lines
+
+CSV_WRITE_BUFFER_SIZE = 1 << 20
+"""The buffer size in bytes used when writing csv files."""
+
 
 class AltoFileExporter:
 
     file_parser = None
-    files = []
+    files = None
 
     def __init__(self, alto_file_parser):
         self.file_parser = alto_file_parser
@@ -19,17 +24,14 @@ class AltoFileExporter:
             for header in f_header:
                 if header not in total_header:
                     total_header.append(header)
-        print(total_header)
         return total_header
 
     def save_csv(self, file_name, **kwargs):
         self.assure_is_file(file_name)
 
-        file_idx = 0
-        csv_lines = [self.get_combined_csv_header(), ]
-        for file in self.files:
-            csv_lines.extend(file.get_csv_lines(add_header=False, static_header=csv_lines[0]))
-            file_idx += 1
+        header = self.get_combined_csv_header()
+        csv_lines = itertools.chain([header, ], itertools.chain.from_iterable(
+            file.get_csv_lines(add_header=False, static_header=header) for file in self.files))
 
         csv_lines = self.reorder_csv_data(csv_lines)
         self.save_to_csv(file_name, csv_lines, **kwargs)
@@ -38,38 +40,54 @@ class AltoFileExporter:
         self.assure_is_dir(directory_name)
 
         for file in self.files:
-            if file.has_lines():
-                csv_lines = file.get_csv_lines(add_header=True)
-                file_name = os.path.join(directory_name, file.get_file_name(ftype='csv'))
-                self.save_to_csv(file_name, csv_lines, **kwargs)
-            else:
-                pass
-
-    def save_json(self, file_name):
+            self.save_file_csv(file, directory_name, **kwargs)
+
+    def save_file_csv(self, file, directory_name, **kwargs):
+        """Save the lines of a single file to a csv file in the given directory."""
+        if file.has_lines():
+            csv_lines = file.get_csv_lines(add_header=True)
+            file_name = os.path.join(directory_name, file.get_file_name(ftype='csv'))
+            self.save_to_csv(file_name, csv_lines, **kwargs)
+
+    def save_json(self, file_name, pretty=False, sort_keys=False):
+        """Save the data of all files to a single json file. The output is compact unless pretty is set, which indents
+        it by two spaces; sort_keys sorts the keys of the objects. Non-ASCII characters are written as UTF-8."""
         self.assure_is_file(file_name)
 
-        json_objects = []
-        for file in self.files:
-            if self.file_parser.get_config_value('export', 'json', 'print_files', default=False):
-                json_objects.append(file.get_standalone_json_object())
-            else:
-                json_objects.extend(file.get_json_objects())
+        if self.file_parser.get_config_value('export', 'json', 'print_files', default=False):
+            json_objects = [file.get_standalone_json_object() for file in self.files]
+        else:
+            json_objects = list(itertools.chain.from_iterable(file.iter_json_objects() for file in self.files))
+
+        write_json(json_objects, file_name, pretty=pretty, sort_keys=sort_keys)
 
-        with open(file_name, 'w', encoding='utf-8') as outfile:
-            json.dump(json_objects, outfile, indent=4, sort_keys=True)
+    def save_jsonl(self, file_name, sort_keys=False):
+        """Save the data as json lines, with one json object per line. The objects are written one by one, so the
+        complete export is never held in memory. See save_json() for the sort_keys option."""
+        self.assure_is_file(file_name)
+
+        if self.file_parser.get_config_value('export', 'json', 'print_files', default=False):
+            json_objects = (file.get_standalone_json_object() for file in self.files)
+        else:
+            json_objects = itertools.chain.from_iterable(file.iter_json_objects() for file in self.files)
 
-    def save_jsons(self, directory_name):
+        write_json_lines(json_objects, file_name, sort_keys=sort_keys)
+
+    def save_jsons(self, directory_name, pretty=False, sort_keys=False):
+        """Save the data of each file to its own json file in the given directory. See save_json() for the
+        formatting options."""
         self.assure_is_dir(directory_name)
 
         for file in self.files:
-            if file.has_lines():
-                json_objects = file.get_json_objects()
-                file_name = os.path.join(directory_name, file.get_file_name(ftype='json'))
+            self.save_file_json(file, directory_name, pretty, sort_keys)
 
-                with open(file_name, 'w', encoding='utf-8') as f:
-                    json.dump(json_objects, f, indent=4, sort_keys=True)
-            else:
-                pass
+    @staticmethod
+    def save_file_json(file, directory_name, pretty=False, sort_keys=False):
+        """Save the lines of a single file to a json file in the given directory."""
+        if file.has_lines():
+            json_objects = file.get_json_objects()
+            file_name = os.path.join(directory_name, file.get_file_name(ftype='json'))
+            write_json(json_objects, file_name, pretty=pretty, sort_keys=sort_keys)
 
     @staticmethod
     def assure_is_file(file_path):
@@ -93,12 +111,13 @@ class AltoFileExporter:
 
     @staticmethod
     def save_to_csv(file_path, csv_lines, **kwargs):
-        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        """Write the given csv lines to the given file. The lines can be any iterable, so they are not required to
+        be held in memory at once."""
+        with open(file_path, 'w', encoding='utf-8', newline='', buffering=CSV_WRITE_BUFFER_SIZE) as f:
             csv_writer = csv.writer(f, delimiter=kwargs.get('delimiter', '\t'),
                                     quotechar=kwargs.get('quotechar', '"'),
                                     quoting=kwargs.get('quoting', csv.QUOTE_MINIMAL))
-            for line in csv_lines:
-                csv_writer.writerow(line)
+            csv_writer.writerows(csv_lines)
 
     def reorder_csv_data(self, csv_lines):
         reorder_config = None
@@ -108,21 +127,12 @@ class AltoFileExporter:
             return csv_lines
 
         if reorder_config is not None:
-            original_header = csv_lines[0]
-            reordered_lines = []
-            for line in csv_lines[1:]:
-                reordered_line = []
-                for key in reorder_config:
-                    try:
-                        reordered_line.append(line[original_header.index(key)])
-                    except ValueError as e:
-                        reordered_line.append('')
-                reordered_lines.append(reordered_line)
-
-            new_header = []
-            for key in reorder_config:
-                new_header.append(reorder_config[key])
-
-            return [new_header] + reordered_lines
+            csv_lines = iter(csv_lines)
+            original_header = next(csv_lines)
+            indices = [original_header.index(key) if key in original_header else None for key in reorder_config]
+            new_header = [reorder_config[key] for key in reorder_config]
+
+            reordered_lines = ([line[idx] if idx is not None else '' for idx in indices] for line in csv_lines)
+            return itertools.chain([new_header, ], reordered_lines)
         else:
             return csv_lines
@@ -1,14 +1,41 @@
 """This module contains the class AltoTextParser, which is used to parse text from ALTO files."""
+import hashlib
+import itertools
+import json
 import logging
 import os
+import pickle
 import re
 import sys
-import xml.etree.ElementTree as ETree
+import tempfile
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+try:
+    from lxml import etree as ETree
+except ImportError:
+    import xml.etree.ElementTree as ETree
 
 from simple_alto_parser.alto_file import AltoFile, AltoFileElement
 from simple_alto_parser.utils import get_logger
 
+CACHE_VERSION = 2
+"""The version of the cache format. Increase it whenever the cached data changes."""
+
+CACHE_IGNORED_CONFIG_KEYS = frozenset(('export', 'logging', 'workers', 'cache_directory'))
+"""The config keys which do not change the parsed data and are therefore not part of the cache key."""
+
+CUSTOM_TAG_PATTERN = re.compile(r'(\w+)\s*\{([^}]*)\}')
+"""Matches the key-value groups of a Transkribus custom tag, e.g. 'readingOrder {index:0;}'."""
+
+READING_ORDER_PATTERN = re.compile(r"index:(\d+);")
+"""Matches the reading order index of a Transkribus custom tag."""
+
+MIN_FILES_PER_WORKER = 100
+"""The number of files parse() gives each worker process at least. A worker costs about 25 ms to start, and sending
+the results of a file back costs about half as much as parsing it, so a pool only pays off for a few hundred files."""
+
 
 class AbstractFileParser(ABC):
     """This class is used to parse text from ALTO files. It stores the files in a list of AltoFile objects."""
@@ -16,7 +43,11 @@ class AbstractFileParser(ABC):
     logger = None
     """The logger of the class."""
 
-    files = []
+    line_type = None
+    """The configured line type. It is read once from the parser config, as it is needed for every parsed block."""
+
+    files = None
+    """The list of AltoFile objects to be parsed."""
 
     def __init__(self, directory_path=None, parser_config=None):
         """The constructor of the class."""
@@ -24,6 +55,10 @@ class AbstractFileParser(ABC):
         self.parser_config = {
             'line_type': 'TextLine',
             'file_ending': '.xml',
+            'workers': 1,                          # Processes used to parse the files. 0 or None: one per CPU.
+                                                   # Capped to one per MIN_FILES_PER_WORKER files.
+            'cache_directory': None,               # Directory to cache parsed files in. None: no caching.
+                                                   # The entries are unpickled, so only use a trusted directory.
             'export': {                            # Options for exporting the parsed data.
                 'csv': {
                     'print_manipulated': False,      # Print the manipulated text to the csv.
@@ -44,32 +79,35 @@ class AbstractFileParser(ABC):
             self.parser_config.update(parser_config)
 
         self.logger = get_logger(self.parser_config['logging']['level'])
+        self.line_type = self.parser_config['line_type']
 
         self.logger.debug("Parser config: %s", self.parser_config)
 
+        self.files = []
         if directory_path:
-            self.files = []
             self.add_files(directory_path, self.get_config_value('file_ending'))
-        else:
-            self.files = []
-
-        if 'meta_data' in self.parser_config:
-            for key, value in self.parser_config['meta_data'].items():
-                self.add_meta_data_to_files(key, value)
 
+        # The static metadata and the metadata from the file names are added to the files in a single pass.
+        static_meta_data = self.parser_config.get('meta_data', {}).items()
+        file_name_pattern = None
         if 'file_name_structure' in self.parser_config:
+            file_name_pattern = re.compile(self.parser_config['file_name_structure']["pattern"])
+            value_names = self.parser_config['file_name_structure']['value_names']
+
+        if static_meta_data or file_name_pattern is not None:
             for file in self.files:
-                match = re.search(self.parser_config['file_name_structure']["pattern"],
-                                  os.path.basename(file.file_path))
-
-                if match and len(match.groups()) == len(self.parser_config['file_name_structure']['value_names']):
-                    idx = 1
-                    for value_name in self.parser_config['file_name_structure']['value_names']:
-                        file.add_file_meta_data(value_name, match.group(idx))
-                        idx += 1
-                else:
-                    self.logger.warning("The file name structure does not match the file name of the file '%s'.",
-                                        os.path.basename(file.file_path))
+                for key, value in static_meta_data:
+                    file.add_file_meta_data(key, value)
+
+                if file_name_pattern is not None:
+                    match = file_name_pattern.search(os.path.basename(file.file_path))
+
+                    if match and len(match.groups()) == len(value_names):
+                        for value_name, value in zip(value_names, match.groups()):
+                            file.add_file_meta_data(value_name, value)
+                    else:
+                        self.logger.warning("The file name structure does not match the file name of the file '%s'.",
+                                            os.path.basename(file.file_path))
 
     def add_files(self, directory_path, file_ending='.xml'):
         """Add all files with the given file ending in the given directory to the list of files to be parsed."""
@@ -78,79 +116,203 @@ class AbstractFileParser(ABC):
             self.logger.error("The given path is not a directory.")
             sys.exit()
 
+        # scandir() returns the file type (and caches the stat result) with the directory listing.
+        with os.scandir(directory_path) as entries:
+            files = [entry for entry in entries if entry.name.endswith(file_ending) and entry.is_file()]
+
         sorting_config = self.get_config_value('sort_files', default={})
         if sorting_config.get('enabled', False):
             sort_key = sorting_config.get('sort_key', 'filename')
             reverse = sorting_config.get('reverse', False)
 
-            if sort_key == 'filename':
-                files = sorted(os.listdir(directory_path), key=lambda x: x, reverse=reverse)
-            elif sort_key == 'date':
-                files = sorted(
-                    os.listdir(directory_path),
-                    key=lambda x: os.path.getmtime(os.path.join(directory_path, x)),
-                    reverse=reverse
-                )
+            if sort_key == 'date':
+                files.sort(key=lambda x: x.stat().st_mtime, reverse=reverse)
             elif sort_key == 'size':
-                files = sorted(
-                    os.listdir(directory_path),
-                    key=lambda x: os.path.getsize(os.path.join(directory_path, x)),
-                    reverse=reverse
-                )
+                files.sort(key=lambda x: x.stat().st_size, reverse=reverse)
             else:
-                # Default sorting by filename if an unknown sort_key is provided
-                files = sorted(os.listdir(directory_path), key=lambda x: x, reverse=reverse)
-        else: # No sorting configured
-            files = os.listdir(directory_path)
+                # Sort by filename, which is also the default if an unknown sort_key is provided
+                files.sort(key=lambda x: x.name, reverse=reverse)
 
         for file in files:
-            if file.endswith(file_ending):
-                self.add_file(os.path.join(directory_path, file))
+            self.add_file(file.path, validate=False)
         self.logger.info("Added %s files to the list of files to be parsed.", len(self.files))
 
-    def add_file(self, file_path):
-        """Add the given file to the list of files to be parsed."""
+    def add_file(self, file_path, validate=True):
+        """Add the given file to the list of files to be parsed. The path is checked to be a file unless validate
+        is False."""
 
-        alto_file = AltoFile(file_path, self)
+        alto_file = AltoFile(file_path, self, validate=validate)
         self.files.append(alto_file)
         self.logger.debug("Added file '%s' to the list of files to be parsed.", file_path)
 
     def parse(self):
-        """Parse the text from all files in the list of files."""
+        """Parse the text from all files in the list of files. If a cache directory is configured, files which have
+        been parsed before are loaded from the cache instead."""
+
+        cache_directory = self.get_config_value('cache_directory')
+        if cache_directory:
+            config_digest = self.get_config_digest()
+            files, cache_paths = [], []
+            for alto_file in self.files:
+                cache_path = self.get_cache_path(alto_file, cache_directory, config_digest)
+                if not self.load_cached_file(alto_file, cache_path):
+                    files.append(alto_file)
+                    cache_paths.append(cache_path)
+            meta_data_before = [dict(alto_file.file_meta_data) for alto_file in files]
+        else:
+            files = self.files
 
-        for alto_file in self.files:
-            self.parse_file(alto_file)
+        workers = self.get_config_value('workers', default=1) or os.cpu_count()
+        workers = min(workers, len(files) // MIN_FILES_PER_WORKER)
+        if workers > 1:
+            self.parse_parallel(workers, files)
+        else:
+            for alto_file in files:
+                self.parse_file(alto_file)
+
+        if cache_directory:
+            os.makedirs(cache_directory, exist_ok=True)
+            for alto_file, cache_path, file_meta_data in zip(files, cache_paths, meta_data_before):
+                self.save_cached_file(alto_file, cache_path, file_meta_data)
+            self.logger.info(f"Loaded {len(self.files) - len(files)} files from the cache.")
         self.logger.info(f"Parsed text from {len(self.files)} files.")
 
+    def parse_parallel(self, workers, files=None):
+        """Parse the text from the given files (all files by default) with a pool of worker processes. Each worker
+        creates one parser of the same class and configuration when it starts, parses its files with it and sends
+        the results back."""
+
+        if files is None:
+            files = self.files
+
+        chunk_size = max(1, len(files) // (4 * workers))
+        tasks = [(alto_file.file_path, alto_file.file_meta_data) for alto_file in files]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(type(self), self.parser_config)) as executor:
+            results = executor.map(_parse_file_in_worker, tasks, chunksize=chunk_size)
+            for alto_file, (file_elements, file_meta_data) in zip(files, results):
+                alto_file.file_elements = file_elements
+                alto_file.file_meta_data = file_meta_data
+
+    def get_cache_path(self, alto_file, cache_directory, config_digest=None):
+        """Return the path of the cache entry of the given file. The entry depends on the file's path, size and
+        modification time as well as on the parser class and its configuration, so a changed file or a changed
+        configuration is parsed again. parse() passes the digest of the configuration, which is the same for all
+        files."""
+
+        if config_digest is None:
+            config_digest = self.get_config_digest()
+        stat = os.stat(alto_file.file_path)
+        key = f"{CACHE_VERSION}:{type(self).__name__}:{config_digest}:" \
+              f"{os.path.abspath(alto_file.file_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        return os.path.join(cache_directory, hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + '.pkl')
+
+    def get_config_digest(self):
+        """Return a stable digest of everything which changes the parsed data: the parser config (without the
+        keys in CACHE_IGNORED_CONFIG_KEYS) and the attributes and keys the parser class reads."""
+
+        config = {key: value for key, value in self.parser_config.items() if key not in CACHE_IGNORED_CONFIG_KEYS}
+        parse_settings = [config, getattr(self, 'attributes_to_get', None), getattr(self, 'ignored_keys', None)]
+        serialized = json.dumps(parse_settings, sort_keys=True, default=repr)
+        return hashlib.blake2b(serialized.encode('utf-8'), digest_size=16).hexdigest()
+
+    def load_cached_file(self, alto_file, cache_path):
+        """Load the parsed elements and metadata of the given file from the given cache entry. Returns True if the
+        file was found in the cache. A damaged entry is treated as missing, so the file is parsed again and the entry
+        is overwritten."""
+
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                file_elements, parsed_meta_data = pickle.load(cache_file)
+        except FileNotFoundError:
+            return False
+        except (EOFError, pickle.UnpicklingError, ValueError, AttributeError) as error:
+            self.logger.warning("The cache entry of file '%s' could not be read (%s). The file is parsed again.",
+                                alto_file.file_path, error)
+            return False
+
+        alto_file.file_elements = file_elements
+        alto_file.file_meta_data.update(parsed_meta_data)
+        self.logger.debug("Loaded file '%s' from the cache.", alto_file.file_path)
+        return True
+
+    def save_cached_file(self, alto_file, cache_path, meta_data_before):
+        """Save the parsed elements of the given file to the given cache entry, together with the metadata which was
+        added or changed by parsing the file. The entry is written to a temporary file first and then moved into
+        place, so an interrupted run never leaves a truncated entry behind."""
+
+        parsed_meta_data = {key: value for key, value in alto_file.file_meta_data.items()
+                            if key not in meta_data_before or meta_data_before[key] != value}
+
+        file_descriptor, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(cache_path))
+        try:
+            with os.fdopen(file_descriptor, 'wb') as cache_file:
+                pickle.dump((alto_file.file_elements, parsed_meta_data), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, cache_path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
     @abstractmethod
     def parse_file(self, alto_file):
         pass
 
-    def _xml_parse_file(self, file_path, namespace):
-        """ This function uses the Etree xml parser to parse an alto file. It should not be called from outside this
-            class. The parse_file() method calls it."""
+    def _iterparse(self, file_path, events=('start', 'end'), tag_names=None):
+        """ This function starts streaming the given file with iterparse (lxml if it is installed). It reads the root
+            element and its namespace and returns them together with the iterator over the events. With lxml, only
+            the given events of the elements with the given local names (all elements by default) are reported, which
+            keeps the loop over the events in Python short. ElementTree cannot filter by tag and reports the start and
+            end events of all elements, so the caller still has to check the event and the tag."""
+
+        if hasattr(ETree, 'LXML_VERSION'):
+            tags = ['{*}' + name for name in tag_names] if tag_names else None
+            parser_events = ETree.iterparse(file_path, events=events, tag=tags)
+            first_event = next(parser_events, None)
+            if first_event is None:
+                # No element with one of the given names: the file is parsed completely and the root is set.
+                root = parser_events.root
+            else:
+                root = first_event[1].getroottree().getroot()
+                parser_events = itertools.chain((first_event,), parser_events)
+        else:
+            parser_events = ETree.iterparse(file_path, events=('start', 'end'))
+            # The first event is the start of the root element.
+            _, root = next(parser_events)
 
-        try:
-            xml_tree = ETree.parse(file_path)
-        except ETree.ParseError as error:
-            raise error
+        xmlns = self._get_namespace(root, file_path, self.NAMESPACE_URIS)
+        return root, xmlns, parser_events
 
-        if 'http://' in str(xml_tree.getroot().tag.split('}')[0].strip('{')):
-            xmlns = xml_tree.getroot().tag.split('}')[0].strip('{')
-        else:
-            try:
-                ns = xml_tree.getroot().attrib
-                xmlns = str(ns).split(' ')[1].strip('}').strip("'")
-            except IndexError as error:
-                xmlns = ''
-                self.logger.error(f"The given file '{file_path}' is not a valid alto file. {error}")
+    @staticmethod
+    def _release_element(element):
+        """ This function frees a completely processed element of a streamed file. The element is cleared and, with
+            lxml, the processed siblings before it are removed from the tree as well."""
+
+        element.clear()
+        if hasattr(element, 'getprevious'):
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def _get_namespace(self, root, file_path, namespace_uris):
+        """ This function returns the namespace of the given root element. It exits if the namespace is not one of
+            the given namespace URIs."""
+
+        root_tag = root.tag
+        xmlns = root_tag[1:root_tag.index('}')] if root_tag.startswith('{') else ''
+        if 'http://' not in xmlns:
+            # The root element is not namespaced, so the namespace is taken from the first token of the first
+            # attribute (usually the schema location).
+            attribute_values = list(root.attrib.values())
+            if not attribute_values:
+                self.logger.error(f"The given file '{file_path}' is not a valid alto file. The root element has no "
+                                  f"namespace.")
                 sys.exit()
+            xmlns = attribute_values[0].split(' ')[0]
 
-        if xmlns not in namespace.values():
+        if xmlns not in namespace_uris:
             self.logger.error(f"The given file '{file_path}' is not a valid alto file.")
             sys.exit()
 
-        return xml_tree, xmlns
+        return xmlns
 
     def get_alto_files(self):
         """Return the list of AltoFile objects."""
@@ -167,9 +329,10 @@ class AbstractFileParser(ABC):
         that match the given pattern are searched for the given parameter. If the parameter is found, it is added to
         the metadata of the file."""
 
+        parameter_pattern = re.compile(parameter_pattern)
         for file in self.files:
             filename = os.path.basename(file.file_path)
-            match = re.search(parameter_pattern, filename)
+            match = parameter_pattern.search(filename)
             if match:
                 file.add_file_meta_data(parameter_name, match.group(1))
 
@@ -195,72 +358,118 @@ class AbstractFileParser(ABC):
         return data
 
     def get_attributes(self, element, attributes_to_get, convert_attr_to_upper=False):
-        """This function reads the attributes of the element and stores them in the element_data dictionary."""
-        attrs = {}
-        for attribute in attributes_to_get:
-            try:
-                att = attribute
-                if convert_attr_to_upper:
-                    att = attribute.upper()
-                attrs[attribute] = element.attrib.get(att)
-            except KeyError:
-                # The attribute is not in the element. This is not a problem.
-                self.logger.debug(f"The attribute '%s' is not in the element.", attribute)
-                pass
-        return attrs
+        """This function reads the attributes of the element and stores them in the element_data dictionary.
+        Attributes which are not in the element are set to None."""
+        attrib = element.attrib
+        if convert_attr_to_upper:
+            return {attribute: attrib.get(name) for attribute, name in upper_attribute_names(tuple(attributes_to_get))}
+        return {attribute: attrib.get(attribute) for attribute in attributes_to_get}
+
+
+@lru_cache(maxsize=None)
+def qualified_tag(xmlns, tag):
+    """Return the given tag name qualified with the given namespace (e.g. '{namespace}TextLine'). The names are cached,
+    as all files of a corpus usually share the same namespace."""
+    return '{%s}%s' % (sys.intern(xmlns), tag)
+
+
+@lru_cache(maxsize=None)
+def upper_attribute_names(attributes):
+    """Return the given attribute names paired with their upper case form (e.g. ('hpos', 'HPOS')). The pairs are
+    cached, so the names are only converted once."""
+    return tuple((attribute, attribute.upper()) for attribute in attributes)
+
+
+_worker_parser = None
+"""The parser of a worker process of parse_parallel(). It is created by _init_worker()."""
+
+
+def _init_worker(parser_class, parser_config):
+    """Create the parser of a worker process. It is called once when the process starts."""
+    global _worker_parser
+    _worker_parser = parser_class(parser_config=parser_config)
+
+
+def _parse_file_in_worker(task):
+    """Parse a single file in a worker process. Returns the parsed elements and the file metadata."""
+    file_path, file_meta_data = task
+    alto_file = AltoFile(file_path, _worker_parser, validate=False)
+    alto_file.file_meta_data = file_meta_data
+    _worker_parser.parse_file(alto_file)
+    return alto_file.file_elements, alto_file.file_meta_data
 
 
 class AltoFileParser(AbstractFileParser):
 
     LINE_TYPES = ['TextLine', 'TextBlock']
 
-    attributes_to_get = ["id", "baseline", "hpos", "vpos", "width", "height"]
-    """A list of the attributes that should be stored in the element_data dictionary."""
+    NAMESPACES = {'alto-1': 'http://schema.ccs-gmbh.com/ALTO',
+                  'alto-2': 'http://www.loc.gov/standards/alto/ns-v2#',
+                  'alto-3': 'http://www.loc.gov/standards/alto/ns-v3#',
+                  'alto-4': 'http://www.loc.gov/standards/alto/ns-v4#'}
+    """The namespaces of the supported alto versions."""
+
+    NAMESPACE_URIS = frozenset(NAMESPACES.values())
+    """The namespace URIs of the supported alto versions, for fast membership tests."""
+
+    attributes_to_get = ("id", "baseline", "hpos", "vpos", "width", "height")
+    """The attributes that should be stored in the element_data dictionary."""
 
     def __init__(self, directory_path=None, parser_config=None):
         """The constructor of the class."""
         super().__init__(directory_path, parser_config)
 
     def parse_file(self, alto_file):
-        """This function parses the alto file and stores the data in the class."""
-        namespace = {'alto-1': 'http://schema.ccs-gmbh.com/ALTO',
-                     'alto-2': 'http://www.loc.gov/standards/alto/ns-v2#',
-                     'alto-3': 'http://www.loc.gov/standards/alto/ns-v3#',
-                     'alto-4': 'http://www.loc.gov/standards/alto/ns-v4#'}
-
-        xml_tree, xmlns = self._xml_parse_file(alto_file.file_path, namespace)
-        if xml_tree is None:
-            raise ValueError("The given file is not a valid xml file.")
-
-        for text_block in xml_tree.iterfind('.//{%s}TextBlock' % xmlns):
-            block_content = ""
-            for text_line in text_block.iterfind('.//{%s}TextLine' % xmlns):
-                line_content = ""
-                for text_bit in text_line.findall('{%s}String' % xmlns):
-                    bit_content = text_bit.attrib.get('CONTENT')
-                    line_content += " " + bit_content
-
-                if self.get_config_value('line_type') == 'TextLine':
-                    element = AltoFileElement(self.sanitize_text(line_content))
-                    element.set_attributes(self.get_attributes(text_line, self.attributes_to_get,
-                                                               convert_attr_to_upper=True))
-                    alto_file.file_elements.append(element)
-
-                block_content += " " + line_content
-
-            if self.get_config_value('line_type') == 'TextBlock':
-                element = AltoFileElement(self.sanitize_text(block_content))
-                element.set_attributes(self.get_attributes(text_block, self.attributes_to_get,
+        """This function parses the alto file and stores the data in the class. The file is streamed with iterparse:
+        each TextBlock is processed as soon as it is complete and cleared afterwards, so the whole document is never
+        held in memory."""
+        _, xmlns, events = self._iterparse(alto_file.file_path, ('end',), ('TextBlock',))
+        text_block_tag = qualified_tag(xmlns, 'TextBlock')
+        for event, element in events:
+            if event == 'end' and element.tag == text_block_tag:
+                self.parse_text_block(element, xmlns, alto_file)
+                self._release_element(element)
+
+    def parse_text_block(self, text_block, xmlns, alto_file):
+        """This function parses a single TextBlock and adds its lines or the block itself to the file elements."""
+        string_tag = qualified_tag(xmlns, 'String')
+        text_line_tag = qualified_tag(xmlns, 'TextLine')
+        line_type = self.line_type
+
+        if line_type == 'TextLine':
+            for text_line in text_block.iter(text_line_tag):
+                line_content = " ".join([text_bit.attrib.get('CONTENT') for text_bit in text_line.findall(string_tag)])
+                element = AltoFileElement(self.sanitize_text(line_content))
+                element.set_attributes(self.get_attributes(text_line, self.attributes_to_get,
                                                            convert_attr_to_upper=True))
                 alto_file.file_elements.append(element)
 
+        elif line_type == 'TextBlock':
+            # Only the text of the whole block is needed, so the strings are collected without building the lines.
+            # Each line starts with an empty part, which separates the lines by two spaces in the joined text.
+            block_parts = []
+            for text_line in text_block.iter(text_line_tag):
+                block_parts.append("")
+                block_parts.extend([text_bit.attrib.get('CONTENT') for text_bit in text_line.findall(string_tag)])
+
+            element = AltoFileElement(self.sanitize_text(" ".join(block_parts)))
+            element.set_attributes(self.get_attributes(text_block, self.attributes_to_get,
+                                                       convert_attr_to_upper=True))
+            alto_file.file_elements.append(element)
+
 
 class PageFileParser(AbstractFileParser):
 
     LINE_TYPES = ['TextLine', 'TextRegion']
 
-    attributes_to_get = ["id", "custom"]
-    """A list of the attributes that should be stored in the element_data dictionary."""
+    NAMESPACES = {'page': 'http://schema.primaresearch.org/PAGE/gts/pagecontent/2013-07-15'}
+    """The namespaces of the supported page versions."""
+
+    NAMESPACE_URIS = frozenset(NAMESPACES.values())
+    """The namespace URIs of the supported page versions, for fast membership tests."""
+
+    attributes_to_get = ("id", "custom")
+    """The attributes that should be stored in the element_data dictionary."""
 
     ignored_keys = ['readingOrder']
     """A list of keys that should be ignored when parsing the custom tags."""
@@ -270,94 +479,106 @@ class PageFileParser(AbstractFileParser):
         super().__init__(directory_path, parser_config)
 
     def parse_file(self, alto_file):
-        """Parses a Transkribus Page XML file."""
-        namespace = {'page': 'http://schema.primaresearch.org/PAGE/gts/pagecontent/2013-07-15'}
-        xml_tree, xmlns = self._xml_parse_file(alto_file.file_path, namespace)
-
-        if xml_tree is None:
-            raise ValueError("The given file is not a valid xml file.")
-
-        # Extract Metadata
-        self.parse_metadata(xml_tree, xmlns, alto_file)
-
-        page_block = xml_tree.find('.//{%s}Page' % xmlns)
-
-        for text_block in page_block.iterfind('.//{%s}TextRegion' % xmlns):
-            block_content = ""
-            block_custom_tags = []
-            block_text_lines = []
-            for text_line in text_block.iterfind('.//{%s}TextLine' % xmlns):
-                line_content = ""
-
-                line_custom_tag = text_line.attrib.get('custom')
-                block_custom_tags.append(line_custom_tag)
+        """Parses a Transkribus Page XML file. The file is streamed with iterparse: each top-level TextRegion is
+        processed (together with its nested regions) as soon as it is complete and cleared afterwards."""
+        root, xmlns, events = self._iterparse(alto_file.file_path, ('start', 'end'), ('Page', 'TextRegion'))
+        page_tag = qualified_tag(xmlns, 'Page')
+        text_region_tag = qualified_tag(xmlns, 'TextRegion')
+        region_depth = 0
+        for event, element in events:
+            if element.tag == page_tag:
+                if event == 'start':
+                    # The Metadata block precedes the Page block, so it is complete at this point.
+                    self.parse_metadata(root, xmlns, alto_file)
+            elif element.tag == text_region_tag:
+                if event == 'start':
+                    region_depth += 1
+                    continue
+
+                region_depth -= 1
+                if region_depth == 0:
+                    for text_block in element.iter(text_region_tag):
+                        self.parse_text_region(text_block, xmlns, alto_file)
+                    self._release_element(element)
+
+    def parse_text_region(self, text_block, xmlns, alto_file):
+        """This function parses a single TextRegion and adds its lines or the region itself to the file elements."""
+        text_equiv_tag = qualified_tag(xmlns, 'TextEquiv')
+        unicode_tag = qualified_tag(xmlns, 'Unicode')
+        # The coordinates of the region are used for the region itself as well as for each of its lines.
+        coords = self.clean_coords(text_block.find(qualified_tag(xmlns, 'Coords')).attrib.get('points'))
+        bbox = self.get_bbox_from_coords(coords)
+        line_type = self.line_type
+        if line_type == 'TextLine':
+            collection_id = self.get_config_value('static_info', 'transkribus_collection', default='no_collection')
+        block_custom_tags = []
+        block_text_lines = []
+        for text_line in text_block.iter(qualified_tag(xmlns, 'TextLine')):
+            line_parts = []
+
+            line_custom_tag = text_line.attrib.get('custom')
+            block_custom_tags.append(line_custom_tag)
+
+            for text_bit in text_line.findall(text_equiv_tag):
+                bit_content = text_bit.findtext(unicode_tag)
+                if bit_content is not None and bit_content.strip() != "":
+                    line_parts.append(bit_content)
+                else:
+                    self.logger.debug(f"The text content of the line is empty. ({alto_file.file_path})")
 
-                for text_bit in text_line.findall('{%s}TextEquiv' % xmlns):
-                    bit_content = text_bit.find('{%s}Unicode' % xmlns).text
-                    if bit_content is not None and bit_content.strip() != "":
-                        line_content += " " + bit_content
-                    else:
-                        self.logger.debug(f"The text content of the line is empty. ({alto_file.file_path})")
-
-                # LINE TYPE: TextLine
-                if self.get_config_value('line_type') == 'TextLine':
-                    element = AltoFileElement(self.sanitize_text(line_content))
-                    coords = text_block.find('{%s}Coords' % xmlns).attrib.get('points')
-                    coords = self.clean_coords(coords)
-                    bbox = self.get_bbox_from_coords(coords)
-                    element.set_attribute('coords', coords)
-                    element.set_attribute('bbox', bbox)
-                    page_iiif_id = alto_file.file_meta_data['transkribus_iiif_id']
-                    anno_iiif_url = f"https://files.transkribus.eu/iiif/2/{page_iiif_id}/{','.join([str(i) for i in bbox])}/full/0/default.jpg"
-                    element.set_attribute('iiif_url', anno_iiif_url)
-                    collection_id = self.get_config_value('static_info', 'transkribus_collection',
-                                                          default='no_collection')
-                    element.set_attribute('composed_id',
-                                          f"{collection_id}-{alto_file.file_meta_data['docId']}-{element.get_attribute('id')}")
-                    element.set_attributes(self.get_attributes(text_block, self.attributes_to_get))
-                    alto_file.file_elements.append(element)
-
-                block_content += " " + line_content
-                block_text_lines.append(line_content)
-
-            # LINE TYPE: TextRegion
-            if self.get_config_value('line_type') == 'TextRegion':
-                element = AltoFileElement(self.sanitize_text(block_content))
-
-                coords = text_block.find('{%s}Coords' % xmlns).attrib.get('points')
-                coords = self.clean_coords(coords)
-                bbox = self.get_bbox_from_coords(coords)
-                custom_structure = self.parse_custom_tag(text_block.attrib.get('custom'))
-                custom_structure = self.remove_unused_keys(custom_structure)
-                parsed_tags = self.extract_tags_of_region(block_custom_tags, block_text_lines, alto_file)
+            # The line content keeps its leading space, the offsets of the custom tags rely on it.
+            line_content = " " + " ".join(line_parts) if line_parts else ""
 
-                element.set_attributes(self.get_attributes(text_block, self.attributes_to_get))
-                element.set_attribute('custom_structure', custom_structure)
+            # LINE TYPE: TextLine
+            if line_type == 'TextLine':
+                element = AltoFileElement(self.sanitize_text(line_content))
                 element.set_attribute('coords', coords)
                 element.set_attribute('bbox', bbox)
-                element.set_attribute('custom_list', block_custom_tags)
-                element.set_attribute('text_lines', block_text_lines)
-                element.set_attribute('custom_list_structure', parsed_tags)
-
-                # Generate the IIIF URL for this region
                 page_iiif_id = alto_file.file_meta_data['transkribus_iiif_id']
                 anno_iiif_url = f"https://files.transkribus.eu/iiif/2/{page_iiif_id}/{','.join([str(i) for i in bbox])}/full/0/default.jpg"
                 element.set_attribute('iiif_url', anno_iiif_url)
+                element.set_attribute('composed_id',
+                                      f"{collection_id}-{alto_file.file_meta_data['docId']}-{element.get_attribute('id')}")
+                element.set_attributes(self.get_attributes(text_block, self.attributes_to_get))
+                alto_file.file_elements.append(element)
 
-                # Get the reading order of the region
-                match = re.search(r"index:(\d+);", element.get_attribute('custom'))
-                if match:
-                    index = int(match.group(1))
-                else:
-                    self.logger.warning(f"The reading order of the region could not be extracted. ({alto_file.file_path})")
-                    index = 0
+            block_text_lines.append(line_content)
 
-                # Create an id for the region
-                collection_id = self.get_config_value('static_info', 'transkribus_collection', default='')
-                element.set_attribute('composed_id',
-                                     f"{collection_id}-{alto_file.file_meta_data['docId']}-{element.get_attribute('id')}-{index}")
+        # LINE TYPE: TextRegion
+        if line_type == 'TextRegion':
+            element = AltoFileElement(self.sanitize_text(" ".join(block_text_lines)))
 
-                alto_file.file_elements.append(element)
+            custom_structure = self.parse_custom_tag(text_block.attrib.get('custom'))
+            custom_structure = self.remove_unused_keys(custom_structure)
+            parsed_tags = self.extract_tags_of_region(block_custom_tags, block_text_lines, alto_file)
+
+            element.set_attributes(self.get_attributes(text_block, self.attributes_to_get))
+            element.set_attribute('custom_structure', custom_structure)
+            element.set_attribute('coords', coords)
+            element.set_attribute('bbox', bbox)
+            element.set_attribute('custom_list', block_custom_tags)
+            element.set_attribute('text_lines', block_text_lines)
+            element.set_attribute('custom_list_structure', parsed_tags)
+
+            # Generate the IIIF URL for this region
+            page_iiif_id = alto_file.file_meta_data['transkribus_iiif_id']
+            anno_iiif_url = f"https://files.transkribus.eu/iiif/2/{page_iiif_id}/{','.join([str(i) for i in bbox])}/full/0/default.jpg"
+            element.set_attribute('iiif_url', anno_iiif_url)
+
+            # Get the reading order of the region
+            match = READING_ORDER_PATTERN.search(element.get_attribute('custom'))
+            if match:
+                index = int(match.group(1))
+            else:
+                self.logger.warning(f"The reading order of the region could not be extracted. ({alto_file.file_path})")
+                index = 0
+
+            # Create an id for the region
+            collection_id = self.get_config_value('static_info', 'transkribus_collection', default='')
+            element.set_attribute('composed_id',
+                                 f"{collection_id}-{alto_file.file_meta_data['docId']}-{element.get_attribute('id')}-{index}")
+
+            alto_file.file_elements.append(element)
 
     @staticmethod
     def get_bbox_from_coords(coords):
@@ -402,35 +623,30 @@ class PageFileParser(AbstractFileParser):
 
     def parse_metadata(self, xml_tree, xmlns, alto_file):
         """This function extracts the metadata from the xml tree and adds it to the file metadata."""
-        metadata_block = xml_tree.find('.//{%s}Metadata' % xmlns)
+        metadata_block = next(xml_tree.iter(qualified_tag(xmlns, 'Metadata')), None)
         if metadata_block is not None:
-            creator = metadata_block.find('{%s}Creator' % xmlns)
-            if creator is not None:
-                creator = creator.text
-            else:
+            # findtext() returns None for a missing element. An element without text (an empty string) is stored as None.
+            creator = metadata_block.findtext(qualified_tag(xmlns, 'Creator'))
+            if creator is None:
                 self.logger.warning(f"The creator is not set. ({alto_file.file_path})")
 
-            created = metadata_block.find('{%s}Created' % xmlns)
-            if created is not None:
-                created = created.text
-            else:
+            created = metadata_block.findtext(qualified_tag(xmlns, 'Created'))
+            if created is None:
                 self.logger.warning(f"The creation date is not set. ({alto_file.file_path})")
 
-            last_change = metadata_block.find('{%s}LastChange' % xmlns)
-            if last_change is not None:
-                last_change = last_change.text
-            else:
+            last_change = metadata_block.findtext(qualified_tag(xmlns, 'LastChange'))
+            if last_change is None:
                 self.logger.warning(f"The last change date is not set. ({alto_file.file_path})")
 
-            alto_file.add_file_meta_data('creator', creator)
-            alto_file.add_file_meta_data('created', created)
-            alto_file.add_file_meta_data('last_change', last_change)
+            alto_file.add_file_meta_data('creator', creator or None)
+            alto_file.add_file_meta_data('created', created or None)
+            alto_file.add_file_meta_data('last_change', last_change or None)
 
             # Now we need to extract the metadata from the TranskribusMetadata block
-            tk_metadata_block = metadata_block.find('{%s}TranskribusMetadata' % xmlns)
+            tk_metadata_block = metadata_block.find(qualified_tag(xmlns, 'TranskribusMetadata'))
             if tk_metadata_block is not None:
                 # Extract the properties. They might or might not be there.
-                for t_property in tk_metadata_block.iterfind('.//{%s}Property' % xmlns):
+                for t_property in tk_metadata_block.iter(qualified_tag(xmlns, 'Property')):
                     key = t_property.attrib.get('key')
                     value = t_property.attrib.get('value')
                     alto_file.add_file_meta_data(key, value)
@@ -438,11 +654,11 @@ class PageFileParser(AbstractFileParser):
                     # Handle special keys
                     self.handle_special_metadata_key(key, value, alto_file)
 
-                for attrib in tk_metadata_block.attrib:
-                    alto_file.add_file_meta_data(attrib, tk_metadata_block.attrib[attrib])
+                for key, value in tk_metadata_block.attrib.items():
+                    alto_file.add_file_meta_data(key, value)
 
                     # Handle special keys
-                    self.handle_special_metadata_key(attrib, tk_metadata_block.attrib[attrib], alto_file)
+                    self.handle_special_metadata_key(key, value, alto_file)
             else:
                 self.logger.warning(f"The TK-metadata block is empty. ({alto_file.file_path})")
         else:
@@ -465,102 +681,73 @@ class PageFileParser(AbstractFileParser):
 
     def extract_tags_of_region(self, input_list, text_lines, alto_file):
         """This function extracts the tags from the input list and the text lines.
+        The tags of each line are built and merged with the open tag in a single pass.
         It returns a list of dictionaries"""
-        parsed_data = []
-
-        idx = 0
-        for item in input_list:
-            # Creates a dict from the custom tag string
-            item_dict = self.parse_custom_tag(item)
-
-            # Remove the unused keys from the dict
-            item_dict = self.remove_unused_keys(item_dict)
-
-            # Extract the text from the text lines and add it to the data
-            item_dict = self.add_text_to_tags(item_dict, text_lines[idx])
-
-            parsed_data.append(item_dict)
-
-            idx += 1
-
-        preliminary_tags_of_region = []
-        for item in parsed_data:
-            for tag_name in item:
-                if isinstance(item[tag_name], dict):
-                    data = {"type": self.get_tag_type(tag_name)}
-                    data.update(item[tag_name])
-                    preliminary_tags_of_region.append(data)
-                if isinstance(item[tag_name], list):
-                    for tag in item[tag_name]:
-                        data = {"type": self.get_tag_type(tag_name)}
-                        data.update(tag)
-                        preliminary_tags_of_region.append(data)
-
-        # This is a flat list of tags. Now we need to merge the tags that are continued over several lines.
         current_tag = None
         tags = []
-        for tag in preliminary_tags_of_region:
-            # First lets remove all the unnecessary keys from the tags
-            if "length" in tag:
-                del tag["length"]
-            else:
-                self.logger.warning(f"The tag does not have a length. {alto_file.file_path}")
-            if "offset" in tag:
-                del tag["offset"]
-            else:
-                self.logger.warning(f"The tag does not have an offset. {alto_file.file_path}")
-            if "line_length" in tag:
-                del tag["line_length"]
-
-            # A new tag starts
-            if "starts_tag" in tag:
-                current_tag = tag
-            # An open tag is continued
-            elif "continues_tag" in tag:
-                if current_tag:
-                    current_tag["text"] += " " + tag["text"]
-                else:
-                    current_tag = tag
-                    self.logger.debug(f"A full-line-tag is continued but no tag is open. Started new Tag {tag} ({alto_file.file_path})")
-            # An open tag is ended
-            elif "ends_tag" in tag:
-                if current_tag:
-                    current_tag["text"] += " " + tag["text"]
-                    if "ends_tag" in current_tag:
-                        del current_tag["ends_tag"]
-                    tags.append(current_tag)
-                    current_tag = None
-                else:
-                    self.logger.warning(f"A tag is ended but no tag is open. {tag} {alto_file.file_path}")
-            else:
-                tags.append(tag)
+        for custom_tag, text_line in zip(input_list, text_lines):
+            line_length = len(text_line)
+
+            # Creates a dict from the custom tag string and removes the unused keys
+            item_dict = self.remove_unused_keys(self.parse_custom_tag(custom_tag))
+
+            for tag_name, values in item_dict.items():
+                tag_type = self.get_tag_type(tag_name)
+                for value_dict in (values if isinstance(values, list) else [values]):
+                    # Extract the text from the text line and add it to the tag
+                    tag = {"type": tag_type}
+                    tag.update(self.extract_from_textline(value_dict, text_line, line_length))
+
+                    # First lets remove all the unnecessary keys from the tag
+                    if "length" in tag:
+                        del tag["length"]
+                    else:
+                        self.logger.warning(f"The tag does not have a length. {alto_file.file_path}")
+                    if "offset" in tag:
+                        del tag["offset"]
+                    else:
+                        self.logger.warning(f"The tag does not have an offset. {alto_file.file_path}")
+                    if "line_length" in tag:
+                        del tag["line_length"]
+
+                    # A new tag starts
+                    if "starts_tag" in tag:
+                        current_tag = tag
+                    # An open tag is continued
+                    elif "continues_tag" in tag:
+                        if current_tag:
+                            current_tag["text"] += " " + tag["text"]
+                        else:
+                            current_tag = tag
+                            self.logger.debug(f"A full-line-tag is continued but no tag is open. Started new Tag {tag} ({alto_file.file_path})")
+                    # An open tag is ended
+                    elif "ends_tag" in tag:
+                        if current_tag:
+                            current_tag["text"] += " " + tag["text"]
+                            if "ends_tag" in current_tag:
+                                del current_tag["ends_tag"]
+                            tags.append(current_tag)
+                            current_tag = None
+                        else:
+                            self.logger.warning(f"A tag is ended but no tag is open. {tag} {alto_file.file_path}")
+                    else:
+                        tags.append(tag)
 
         return tags
 
-    def add_text_to_tags(self, item_dict, text_line):
-
-        for d_item in item_dict:
-            if isinstance(item_dict[d_item], dict):
-                item_dict[d_item] = self.extract_from_textline(item_dict[d_item], text_line)
-            else:
-                new_items = []
-                for item in item_dict[d_item]:
-                    item = self.extract_from_textline(item, text_line)
-                    new_items.append(item)
-                item_dict[d_item] = new_items
-
-        return item_dict
-
-    def extract_from_textline(self, item, text_line):
+    def extract_from_textline(self, item, text_line, line_length=None):
         if "length" in item and "offset" in item:
+            if line_length is None:
+                line_length = len(text_line)
             length = item["length"] = int(item["length"])
             offset = item["offset"] = int(item["offset"])
+            end = offset + length + 1
 
-            item["text"] = text_line[offset+1:offset+length+1]
-            item["line_length"] = len(text_line)
+            item["text"] = text_line[offset+1:end]
+            item["line_length"] = line_length
 
             line_starter = (offset == 0)
-            line_ender = (offset + length + 1 == len(text_line))
+            line_ender = (end == line_length)
             continued = ("continued" in item)
 
             if continued:
@@ -586,11 +773,18 @@ class PageFileParser(AbstractFileParser):
         return item_dict
 
     def parse_custom_tag(self, custom_tag):
-        # Regex to find key-value pairs within curly braces
-        pattern = r'(\w+)\s*\{([^}]*)\}'
-
-        # Find all pattern matches in the current string
-        matches = re.findall(pattern, custom_tag)
+        # Find all key-value pairs within curly braces in the current string. The string is split at the closing
+        # braces (the part after the last one is not closed); strings with other keys than plain ASCII names are
+        # parsed with the regex instead.
+        matches = []
+        for part in custom_tag.split('}')[:-1]:
+            if '{' in part:
+                key, _, values = part.partition('{')
+                key = key.strip()
+                if not (key.isascii() and key.isidentifier()):
+                    matches = CUSTOM_TAG_PATTERN.findall(custom_tag)
+                    break
+                matches.append((key, values))
 
         # Dictionary to store data for the current string
         item_dict = {}
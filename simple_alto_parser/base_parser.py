@@ -4,20 +4,21 @@ from simple_alto_parser.utils import get_logger
 class BaseParser:
 
     logger = None
-    matches = []
-    batch_conditions = []
+    matches = None
+    batch_conditions = None
 
     def __init__(self, parser):
         """The constructor of the class. It initializes the list of files.
-        The lines are a list of AltoXMLElement objects."""
+        The lines are a list of AltoFileElement objects."""
         self.logger = get_logger()
         self.parser = parser
         self.matches = []
+        self.batch_conditions = []
 
     def mark(self, name, value):
         """Add the given category to all matches."""
         for match in self.matches:
-            self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].add_parser_data(name, value)
+            match.line.add_parser_data(name, value)
         return self
 
     def clear(self):
@@ -27,9 +28,7 @@ class BaseParser:
     def print_matches(self):
         """Print all matches."""
         for match in self.matches:
-            print("Found pattern '%s' in line '%s'." %
-                  (match,
-                   self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].get_text()))
+            print("Found pattern '%s' in line '%s'." % (match, match.line.get_text()))
         return self
 
     def get_unmatched(self):
@@ -61,7 +60,7 @@ class BaseParser:
 
         # Find name in parser config
         if name_found:
-            print("Config Found")
+            self.logger.debug("Found the batch '%s' in the parser config.", name)
             for cond in batch_config['conditions']:
                 self.batch_conditions.append((cond['key'], "in", self.get_page_list(cond['values'])))
         else:
@@ -70,7 +69,7 @@ class BaseParser:
         # If name exists, get batch config
         # Set variables according to batch config
 
-        print("BC", self.batch_conditions)
+        self.logger.debug("Batch conditions: %s", self.batch_conditions)
 
         return self
 
@@ -107,7 +106,10 @@ class BaseParser:
 
 class ParserMatch:
 
-    def __init__(self, file_id, line_id, match):
+    __slots__ = ('file_id', 'line_id', 'match', 'line')
+
+    def __init__(self, file_id, line_id, match, line=None):
         self.file_id = file_id
         self.line_id = line_id
         self.match = match
+        self.line = line
@@ -1,26 +1,27 @@
-import json
 import re
 import sys
 
 from simple_alto_parser import BaseParser
 from simple_alto_parser.base_parser import ParserMatch
+from simple_alto_parser.utils import read_json
 
 
 class AltoDictionaryParser(BaseParser):
     """This class is used to find patterns in the text lines of an alto file."""
 
-    dictionaries = []
+    dictionaries = None
 
     def __init__(self, parser):
         """The constructor of the class. It initializes the list of files.
-        The lines are a list of AltoXMLElement objects."""
+        The lines are a list of AltoFileElement objects."""
         super().__init__(parser)
+        self.dictionaries = []
 
     def load(self, dictionary_file):
         """Load a dictionary from a json file."""
         self.logger.info(f'Loading dictionary "{dictionary_file}"...')
         all_variants = []
-        dictionary = json.load(open(dictionary_file, encoding='utf-8'))
+        dictionary = read_json(dictionary_file)
         for entry in dictionary:
             if 'label' in entry:
                 if 'variants' not in entry:
@@ -39,7 +40,6 @@ class AltoDictionaryParser(BaseParser):
                 self.logger.error(f'Dictionary Entry "{entry}" from dictionary "{dictionary_file}" has no label.')
                 sys.exit()
 
-        all_variants = sorted(all_variants, key=len, reverse=True)
         self.dictionaries.append(Dictionary(dictionary, all_variants))
         self.logger.info(f"Loaded dictionary: {dictionary_file}")
 
@@ -52,23 +52,32 @@ class AltoDictionaryParser(BaseParser):
 
             for line in file.get_text_lines():
                 match_on_line = False
+                line_text = line.get_text().strip()
+                if strict:
+                    normalized_text = Dictionary.normalize(line_text)
 
                 for dictionary in self.dictionaries:
-                    for variant in dictionary.all_variants:
+                    if strict:
+                        # Only the variants which are equal to the normalized line can match.
+                        variants = dictionary.strict_index.get(normalized_text, [])
+                    else:
+                        variants = dictionary.all_variants
+
+                    for variant in variants:
                         if restrict_to is not None and variant[1]['type'] != restrict_to:
                             continue
                         if strict:
-                            match = variant[0].strip('.').lower() == line.get_text().strip().strip('.').lower()
-                            if match:
-                                match = variant[0]
+                            match = variant[0]
+                        elif variant[0] in line_text:
+                            match = re.search(re.escape(variant[0]), line_text)
                         else:
-                            match = re.search(re.escape(variant[0]), line.get_text().strip())
+                            match = None
 
                         if match:
                             if not multiple and match_on_line:
                                 continue
                             self.logger.debug(f"Found dictionary match '{variant[0]}' in line '{line.get_text()}'")
-                            self.matches.append(DictionaryMatch(file_id, line_id, match, variant[1]))
+                            self.matches.append(DictionaryMatch(file_id, line_id, match, variant[1], line))
                             match_on_line = True
 
                 line_id += 1
@@ -83,18 +92,18 @@ class AltoDictionaryParser(BaseParser):
                 match_text = match.match
             else:
                 match_text = match.match.group(0)
-            self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].add_parser_data(category, match_text)
+            match.line.add_parser_data(category, match_text)
         return self
 
     def remove(self, replacement=''):
         """Remove all matched patterns from matching lines."""
         for match in self.matches:
             if type(match.match) == str:
-                new_text = self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].get_text().replace(match.match, replacement)
+                new_text = match.line.get_text().replace(match.match, replacement)
             else:
-                new_text = self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].get_text().replace(match.match.group(0), replacement)
+                new_text = match.line.get_text().replace(match.match.group(0), replacement)
 
-            self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].set_text(new_text)
+            match.line.set_text(new_text)
         return self
 
     def replace(self, replacement):
@@ -104,10 +113,10 @@ class AltoDictionaryParser(BaseParser):
 
 class DictionaryMatch(ParserMatch):
 
-    dict_entry = {}
+    __slots__ = ('dict_entry',)
 
-    def __init__(self, file_id, line_id, match, dict_entry={}):
-        super().__init__(file_id, line_id, match)
+    def __init__(self, file_id, line_id, match, dict_entry={}, line=None):
+        super().__init__(file_id, line_id, match, line)
         self.dict_entry = dict_entry
 
     def __str__(self):
@@ -116,9 +125,19 @@ class DictionaryMatch(ParserMatch):
 
 class Dictionary:
 
-    dictionary = []
-    all_variants = []
+    dictionary = None
+    all_variants = None
 
     def __init__(self, dictionary, all_variants):
         self.dictionary = dictionary
-        self.all_variants = all_variants
\ No newline at end of file
+        self.all_variants = all_variants
+
+        # Index the variants by their normalized form for strict matching.
+        self.strict_index = {}
+        for variant in all_variants:
+            self.strict_index.setdefault(self.normalize(variant[0]), []).append(variant)
+
+    @staticmethod
+    def normalize(text):
+        """Return the form of the text which is compared in strict matching."""
+        return text.strip('.').lower()
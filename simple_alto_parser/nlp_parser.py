@@ -33,7 +33,7 @@ class AltoNLPParser(BaseParser):
                 html_render += f'<strong><code>{line.get_text()}</code></strong><br/>'
                 for word in doc.ents:
                     if label is None or word.label_ == label:
-                        self.matches.append(NLPMatch(file_id, line_id, word))
+                        self.matches.append(NLPMatch(file_id, line_id, word, line))
                 # html_render += displacy.render(doc, style="ent") + "<br><hr>"
                 line_id += 1
             html_render += '<br/>'
@@ -52,5 +52,7 @@ class AltoNLPParser(BaseParser):
 
 class NLPMatch(ParserMatch):
 
-    def __init__(self, line_id, file_id, match):
-        super().__init__(line_id, file_id, match)
\ No newline at end of file
+    __slots__ = ()
+
+    def __init__(self, line_id, file_id, match, line=None):
+        super().__init__(line_id, file_id, match, line)
\ No newline at end of file
@@ -1,68 +1,118 @@
 import re
+import sys
+from functools import lru_cache
+
+try:
+    import re2
+except ImportError:
+    re2 = None
 
 from simple_alto_parser import BaseParser
 from simple_alto_parser.base_parser import ParserMatch
 
+ENGINES = ('re', 're2')
+"""The regex engines which can be used by the pattern parser. 're2' requires the google-re2 package."""
+
+
+@lru_cache(maxsize=1024)
+def compile_pattern(pattern, engine='re'):
+    """Compile the given regex pattern with the given engine. Compiled patterns are cached, so a pattern which is
+    used several times is only compiled once."""
+    if engine == 're2':
+        return re2.compile(pattern)
+    return re.compile(pattern)
+
 
 class AltoPatternParser(BaseParser):
 
-    matches = []
+    engine = 're'
+    """The regex engine used to find the patterns. The linear time 're2' engine supports most, but not all of the
+    syntax of Python's re module (e.g. no backreferences)."""
 
-    def __init__(self, parser):
+    def __init__(self, parser, engine='re'):
         """The constructor of the class."""
         super().__init__(parser)
 
+        if engine not in ENGINES:
+            self.logger.error(f"The regex engine '{engine}' is not supported. Use one of {ENGINES}.")
+            sys.exit()
+        if engine == 're2' and re2 is None:
+            self.logger.error("The regex engine 're2' requires the google-re2 package.")
+            sys.exit()
+        self.engine = engine
+
+    def precompile(self, patterns):
+        """Compile the given patterns in advance, so later calls to find() can use the cached patterns."""
+        for pattern in patterns:
+            compile_pattern(pattern, self.engine)
+        return self
+
     def find(self, pattern):
         """Find a pattern in the text lines."""
         self.clear()
+        pattern = compile_pattern(pattern, self.engine)
+        search = pattern.search
+        append = self.matches.append
 
-        fidx = 0
-        for file in self.parser.get_alto_files():
+        for fidx, file in enumerate(self.parser.get_alto_files()):
             if self.is_in_batch(file):
-                lidx = 0
-                for line in file.get_text_lines():
-                    match = re.search(pattern, line.get_text())
+                for lidx, line in enumerate(file.get_text_lines()):
+                    match = search(line.text)
                     if match:
-                        self.matches.append(PatternMatch(pattern, fidx, lidx, match))
-                    lidx += 1
+                        append(PatternMatch(pattern, fidx, lidx, match, line))
             else:
-                print("Not in batch")
-
-            fidx += 1
+                self.logger.debug("The file '%s' is not in the batch.", file.file_path)
 
         return self
 
     def categorize(self, category):
         """Add the given category to all matches."""
-        for match in self.matches:
-            if type(category) == str:
-                self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id]\
-                    .add_parser_data(category, match.match.group(1))
-            if type(category) == list:
-                c_id = 1
-                for c in category:
-                    self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id]\
-                        .add_parser_data(c, match.match.group(c_id))
-                    c_id += 1
-        return self
+        return self.apply(category=category)
 
     def remove(self, replacement=''):
         """Remove all matched patterns from matching lines."""
+        return self.apply(replacement=replacement)
+
+    def apply(self, category=None, mark=None, replacement=None):
+        """Apply several operations to all matches in a single pass over the matches. The matches are categorized
+        with the given category (see categorize()), marked with the given (name, value) pair (see mark()) and the
+        matched patterns are replaced with the given replacement (see replace(), '' removes them)."""
+        if type(category) == str:
+            groups = [(category, 1)]
+        elif type(category) == list:
+            groups = [(c, c_id) for c_id, c in enumerate(category, start=1)]
+        else:
+            groups = []
+
         for match in self.matches:
-            self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].set_text(
-                re.sub(match.pattern, replacement,
-                       self.parser.get_alto_files()[match.file_id].get_text_lines()[match.line_id].get_text()))
+            line = match.line
+            for name, group in groups:
+                line.add_parser_data(name, match.match.group(group))
+            if mark is not None:
+                line.add_parser_data(*mark)
+            if replacement is not None:
+                line.set_text(match.pattern.sub(replacement, line.get_text()))
         return self
 
     def replace(self, replacement):
         self.remove(replacement)
         return self
 
+    def replace_characters(self, replacements):
+        """Replace single characters in all text lines in one pass. The replacements are given as a dictionary which
+        maps each character to its replacement string, or to None if the character should be removed."""
+        table = str.maketrans(replacements)
+        for file in self.parser.get_alto_files():
+            if self.is_in_batch(file):
+                for line in file.get_text_lines():
+                    line.set_text(line.get_text().translate(table))
+        return self
+
 
 class PatternMatch(ParserMatch):
 
-    pattern = None
+    __slots__ = ('pattern',)
 
-    def __init__(self, pattern, file_id, line_id, match):
-        super().__init__(file_id, line_id, match)
+    def __init__(self, pattern, file_id, line_id, match, line=None):
+        super().__init__(file_id, line_id, match, line)
         self.pattern = pattern
@@ -1,5 +1,11 @@
+import json
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 LOGGER = None
 
 def get_logger(level=None):
@@ -28,3 +34,50 @@ def get_logger(level=None):
     LOGGER.addHandler(ch2)
 
     return LOGGER
+
+
+def write_json(data, file_path, pretty=False, sort_keys=False):
+    """This function writes the given data to a json file. If orjson is installed, it is used to serialize the data,
+    otherwise the standard json module is used with the same layout: compact, or indented by two spaces if pretty is
+    set, and with non-ASCII characters written as UTF-8."""
+    if orjson is not None:
+        option = 0
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        json_bytes = orjson.dumps(data, option=option)
+    else:
+        json_bytes = json.dumps(data, indent=2 if pretty else None, separators=(',', ': ') if pretty else (',', ':'),
+                                sort_keys=sort_keys, ensure_ascii=False).encode('utf-8')
+
+    with open(file_path, 'wb') as outfile:
+        outfile.write(json_bytes)
+
+
+def read_json(file_path):
+    """This function reads the given json file and returns its content. If orjson is installed, it is used to
+    deserialize the data, otherwise the standard json module is used."""
+    if orjson is not None:
+        with open(file_path, 'rb') as infile:
+            return orjson.loads(infile.read())
+    with open(file_path, encoding='utf-8') as infile:
+        return json.load(infile)
+
+
+def write_json_lines(objects, file_path, sort_keys=False):
+    """This function writes each object of the given iterable as a single line of json to the file. The objects are
+    serialized one at a time, so the iterable can be a generator. orjson is used if it is installed, otherwise the
+    standard json module is used with the same layout (see write_json())."""
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+    with open(file_path, 'wb') as outfile:
+        for obj in objects:
+            if orjson is not None:
+                outfile.write(orjson.dumps(obj, option=option))
+            else:
+                outfile.write(json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys,
+                                         ensure_ascii=False).encode('utf-8') + b'\n')